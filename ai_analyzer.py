@@ -6,10 +6,30 @@ AI分析模块 - 使用智谱AI (GLM-4-Flash)
 """
 
 import os
+import re
 import json
+import heapq
+import time
+import random
+import sqlite3
+import hashlib
 import logging
+import textwrap
+import threading
+from collections import deque
+from operator import itemgetter
+from string import Template
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    # orjson 解析更快，未安装时回退到标准库
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 logger = logging.getLogger(__name__)
 
@@ -17,37 +37,31 @@ logger = logging.getLogger(__name__)
 ZHIPU_API_URL = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
 ZHIPU_MODEL = "glm-4-flash"
 
+# 分析结果缓存配置
+# 未设置或为空（如 .env 中写了 DAILYNEWS_CACHE_PATH=）时使用默认路径
+CACHE_PATH = os.environ.get('DAILYNEWS_CACHE_PATH') or os.path.expanduser('~/.dailynews_cache.sqlite')
+CACHE_TTL = 7 * 24 * 3600  # 缓存有效期：7天
 
-class ZhipuAnalyzer:
-    """智谱AI新闻分析器"""
-    
-    def __init__(self, api_key: str = None, target_language: str = "zh-CN"):
-        self.api_key = api_key or os.environ.get('ZHIPU_API_KEY', '')
-        self.model = ZHIPU_MODEL
-        self.target_language = target_language  # 目标语言，默认简体中文
-    
-    def _build_prompt(self, news_item: Dict[str, Any]) -> str:
-        """构建分析提示词"""
-        category_names = {
-            'tech': '科技',
-            'science': '科学', 
-            'society': '社会',
-            'international': '国际'
-        }
-        
-        category = news_item.get('category', 'tech')
-        category_name = category_names.get(category, '科技')
-        
-        return f"""你是一个专业的金融和科技新闻分析师。请分析以下新闻并按JSON格式返回分析结果。
+# 并发分析配置
+ANALYZE_WORKERS = 8  # 同时进行的API请求数
+ZHIPU_QPS = 5  # 每秒最多发起的API请求数，提前限流避免429
 
-新闻标题：{news_item.get('title', '')}
-新闻来源：{news_item.get('source', '')}
-新闻摘要：{news_item.get('summary', '')[:300]}
-新闻分类：{category_name}
+# 瞬时错误（网络抖动、429、5xx）重试配置
+API_MAX_RETRIES = 3
+API_BACKOFF_FACTOR = 0.5
+API_RETRY_STATUS = (429, 500, 502, 503, 504)
 
-请返回以下格式的JSON（必须是合法的JSON，不要有其他内容）：
-{{
-    "core_point": "一句话核心要点（15-30字）",
+# 每次API调用批量分析的新闻条数
+ANALYZE_BATCH_SIZE = 8
+
+# 生成参数：结构化输出使用低温度，并限制输出长度
+ANALYSIS_TEMPERATURE = 0.2
+ANALYSIS_MAX_TOKENS = 400  # 单条分析结果的输出上限，批量请求按条数放大
+TRANSLATE_TEMPERATURE = 0.01  # 智谱接口温度接近0即等同贪心解码
+TRANSLATE_MAX_TOKENS = 100
+
+# 分析结果JSON字段说明（单条与批量提示词共用）
+ANALYSIS_SCHEMA = '''    "core_point": "一句话核心要点（15-30字）",
     "fund_signal": "基金建议：买入/卖出/观望 + 具体方向（如：买入AI主题基金、卖出传统能源ETF、观望）",
     "fund_details": "简要说明基金建议的理由（30-50字）",
     "dev_impact": "对独立开发者的实际影响（30-50字）",
@@ -57,15 +71,319 @@ class ZhipuAnalyzer:
     "impact_level": "影响程度：高/中/低 + 具体说明（如：高-可能引发行业格局重大改变）",
     "timeliness": "时效性：热门/新鲜/平稳/过期 + 说明（如：新鲜-刚发布24小时内）",
     "certainty": "确定性：高/中/低 + 说明（如：高-来源权威且事实明确）",
-    "opportunity_type": "机会类型：创业机会/基金机会/两者皆有/不适用 + 具体说明（如：创业机会-新赛道机会、基金机会-行业轮动机会）"
-}}
+    "opportunity_type": "机会类型：创业机会/基金机会/两者皆有/不适用 + 具体说明（如：创业机会-新赛道机会、基金机会-行业轮动机会）"'''
 
-注意：
-1. 只返回JSON，不要有其他文字
+ANALYSIS_NOTES = """1. 只返回JSON，不要有其他文字
 2. 如果新闻与投资无关，fund_signal写"不适用"
 3. dev_impact要从独立开发者角度分析实际影响
 4. relevance_score要客观评分
 5. 所有字段都必须填写完整"""
+
+# 单条分析提示词
+ANALYSIS_PROMPT_TEMPLATE = Template(f"""你是一个专业的金融和科技新闻分析师。请分析以下新闻并按JSON格式返回分析结果。
+
+新闻标题：$title
+新闻来源：$source
+新闻摘要：$summary
+新闻分类：$category
+
+请返回以下格式的JSON（必须是合法的JSON，不要有其他内容）：
+{{
+${{translate_field}}{ANALYSIS_SCHEMA}
+}}
+
+注意：
+{ANALYSIS_NOTES}$translate_note""")
+
+# 批量分析提示词
+BATCH_PROMPT_TEMPLATE = Template(f"""你是一个专业的金融和科技新闻分析师。请逐条分析以下$count条新闻并按JSON格式返回分析结果。
+
+新闻列表（每行一条，id为新闻编号，translate为true表示标题需要翻译）：
+$news_lines
+
+请返回以下格式的JSON对象（必须是合法的JSON，不要有其他内容），results中每条新闻对应一个结果：
+{{
+    "results": [
+        {{
+            "id": 新闻编号（与输入一致）,
+            "translated_title": "标题的${{target_name}}译文（仅translate为true时填写，否则为空字符串）",
+{textwrap.indent(ANALYSIS_SCHEMA, ' ' * 8)}
+        }}
+    ]
+}}
+
+注意：
+{ANALYSIS_NOTES}
+6. 每条新闻都必须返回一个结果，id与输入保持一致
+7. translated_title只填写标题译文，不要有任何解释""")
+
+# 关键词预筛选：只把启发式得分最高的新闻交给大模型分析，其余使用默认分析
+LLM_ANALYZE_LIMIT = 60
+HIGH_SIGNAL_KEYWORDS = {
+    'tech': [
+        'AI', 'AGI', 'GPT', 'LLM', 'OpenAI', 'Anthropic', 'Gemini', 'DeepSeek', 'Nvidia', 'chip', 'semiconductor',
+        'GPU', 'TSMC', 'Apple', 'Google', 'Microsoft', 'Meta', 'Amazon', 'Tesla', 'startup', 'funding', 'IPO',
+        'acquisition', 'acquire', 'antitrust', 'open source', 'API', 'developer', 'cloud', 'security', 'breach',
+        'vulnerability', 'robot', 'quantum', 'app store', 'regulation',
+        '人工智能', '大模型', '芯片', '半导体', '算力', '融资', '上市', '收购', '开源', '开发者', '云计算',
+        '漏洞', '机器人', '自动驾驶', '新能源', '华为', '小米', '字节', '阿里', '腾讯', '百度'
+    ],
+    'science': [
+        'breakthrough', 'discovery', 'clinical trial', 'vaccine', 'cancer', 'gene', 'CRISPR', 'climate', 'fusion',
+        'battery', 'quantum', 'NASA', 'SpaceX', 'Mars', 'moon', 'telescope', 'physics', 'neuroscience', 'drug',
+        '突破', '发现', '临床', '疫苗', '癌症', '基因', '气候', '核聚变', '电池', '量子', '航天', '火星', '药物'
+    ],
+    'society': [
+        'policy', 'law', 'court', 'election', 'economy', 'inflation', 'jobs', 'unemployment', 'housing', 'tax',
+        'health', 'education', 'strike',
+        '政策', '法规', '法院', '选举', '经济', '通胀', '就业', '房价', '税', '医疗', '教育', '消费', '央行', '利率'
+    ],
+    'international': [
+        'tariff', 'trade', 'sanction', 'war', 'ceasefire', 'summit', 'G7', 'G20', 'NATO', 'OPEC', 'oil',
+        'central bank', 'Fed', 'interest rate', 'election', 'China',
+        '关税', '贸易', '制裁', '战争', '停火', '峰会', '石油', '美联储', '利率', '汇率'
+    ]
+}
+LOW_VALUE_KEYWORDS = [
+    'sponsored', 'deal', 'deals', 'discount', 'coupon', 'sale', 'best', 'review', 'giveaway', 'quiz', 'horoscope',
+    'podcast', 'newsletter', 'how to watch', 'photos', 'gallery',
+    '优惠', '折扣', '促销', '广告', '抽奖', '开箱', '评测'
+]
+
+
+def _compile_keywords(keywords: List[str]) -> re.Pattern:
+    """将关键词列表编译为单个正则，英文词按单词边界匹配（允许复数）"""
+    parts = []
+    for keyword in sorted(set(keywords), key=len, reverse=True):
+        escaped = re.escape(keyword)
+        parts.append(rf'\b{escaped}s?\b' if keyword.isascii() else escaped)
+    return re.compile('|'.join(parts), re.IGNORECASE)
+
+
+KEYWORD_PATTERNS = {category: _compile_keywords(words) for category, words in HIGH_SIGNAL_KEYWORDS.items()}
+LOW_VALUE_RE = _compile_keywords(LOW_VALUE_KEYWORDS)
+
+
+def keyword_score(news_item: Dict[str, Any]) -> int:
+    """基于关键词命中数的廉价相关性评分"""
+    text = f"{news_item.get('title', '')} {news_item.get('summary', '')}"
+    pattern = KEYWORD_PATTERNS.get(news_item.get('category', 'tech'), KEYWORD_PATTERNS['tech'])
+    return len(pattern.findall(text)) - 2 * len(LOW_VALUE_RE.findall(news_item.get('title', '')))
+
+
+# 新闻分类名称
+CATEGORY_NAMES = {
+    'tech': '科技',
+    'science': '科学',
+    'society': '社会',
+    'international': '国际'
+}
+
+# 翻译目标语言名称
+LANGUAGE_NAMES = {
+    'zh-CN': '简体中文',
+    'zh-TW': '繁体中文',
+    'en': '英语',
+    'ja': '日语',
+    'ko': '韩语'
+}
+
+# 中文字符检测（正则在C层完成逐字符扫描）
+CJK_RE = re.compile(r'[\u4e00-\u9fff]')
+
+
+def has_chinese(text: str) -> bool:
+    """检查文本是否包含中文字符"""
+    return CJK_RE.search(text) is not None
+
+
+class JitteredRetry(Retry):
+    """指数退避叠加随机抖动，避免并发请求同时重试"""
+    
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return backoff * random.uniform(0.5, 1.5) if backoff else 0
+
+
+class RateLimiter:
+    """滑动窗口限流器，限制每秒请求数"""
+    
+    def __init__(self, max_calls: int, period: float = 1.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """阻塞直到可以发起下一次请求"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            time.sleep(wait)
+
+
+class AnalysisCache:
+    """基于SQLite的分析结果缓存，避免对相同新闻重复调用API"""
+    
+    def __init__(self, path: str = CACHE_PATH, ttl: int = CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS analysis_cache ('
+                'hash TEXT PRIMARY KEY, response TEXT NOT NULL, created_at INTEGER NOT NULL)'
+            )
+            self._conn.execute('DELETE FROM analysis_cache WHERE created_at < ?', (int(time.time()) - self.ttl,))
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"分析缓存不可用: {e}")
+            self._conn = None
+    
+    @staticmethod
+    def make_key(news_item: Dict[str, Any], target_language: str) -> str:
+        """根据标题、摘要、分类和翻译目标语言计算缓存键"""
+        title = news_item.get('title', '').strip().lower()
+        summary = news_item.get('summary', '')[:300]
+        category = news_item.get('category', 'tech')
+        raw = f"{title}\n{summary}\n{category}\n{target_language}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取未过期的缓存结果"""
+        if self._conn is None:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT response FROM analysis_cache WHERE hash = ? AND created_at >= ?',
+                    (key, int(time.time()) - self.ttl)
+                ).fetchone()
+            return json_loads(row[0]) if row else None
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logger.warning(f"读取分析缓存失败: {e}")
+            return None
+    
+    def set(self, key: str, analysis: Dict[str, Any]) -> None:
+        """写入分析结果"""
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO analysis_cache (hash, response, created_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(analysis, ensure_ascii=False), int(time.time()))
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"写入分析缓存失败: {e}")
+
+
+class ZhipuAnalyzer:
+    """智谱AI新闻分析器"""
+    
+    def __init__(self, api_key: str = None, target_language: str = "zh-CN"):
+        self.api_key = api_key or os.environ.get('ZHIPU_API_KEY', '')
+        self.model = ZHIPU_MODEL
+        self.target_language = target_language  # 目标语言，默认简体中文
+        self.cache = AnalysisCache()
+        self._session = requests.Session()  # 复用HTTP连接
+        retry = JitteredRetry(
+            total=API_MAX_RETRIES,
+            read=0,  # 读超时不重试：请求可能已被处理，重发会重复计费并长时间占用并发名额
+            backoff_factor=API_BACKOFF_FACTOR,
+            status_forcelist=API_RETRY_STATUS,
+            allowed_methods=frozenset(['POST']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self._session.mount('https://', HTTPAdapter(max_retries=retry, pool_maxsize=ANALYZE_WORKERS))
+        self._semaphore = threading.Semaphore(ANALYZE_WORKERS)
+        self._rate_limiter = RateLimiter(ZHIPU_QPS)
+    
+    def _post(self, payload: Dict[str, Any], timeout: int) -> requests.Response:
+        """发起API请求（受并发数和QPS限制）"""
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+        with self._semaphore:
+            self._rate_limiter.acquire()
+            return self._session.post(
+                ZHIPU_API_URL,
+                headers=headers,
+                json=payload,
+                timeout=timeout
+            )
+    
+    def _build_prompt(self, news_item: Dict[str, Any]) -> str:
+        """构建分析提示词"""
+        category = news_item.get('category', 'tech')
+        
+        # 非中文标题在同一次调用中顺带翻译，省去单独的翻译请求
+        title = news_item.get('title', '')
+        translate_field = ''
+        translate_note = ''
+        if title and not has_chinese(title):
+            target_name = LANGUAGE_NAMES.get(self.target_language, '简体中文')
+            translate_field = f'    "translated_title": "新闻标题的{target_name}译文",\n'
+            translate_note = f'\n6. translated_title只填写标题的{target_name}译文，不要有任何解释'
+        
+        return ANALYSIS_PROMPT_TEMPLATE.substitute(
+            title=title,
+            source=news_item.get('source', ''),
+            summary=news_item.get('summary', '')[:300],
+            category=CATEGORY_NAMES.get(category, '科技'),
+            translate_field=translate_field,
+            translate_note=translate_note
+        )
+    
+    def _build_batch_prompt(self, news_items: List[Dict[str, Any]]) -> str:
+        """构建批量分析提示词，一次请求分析多条新闻"""
+        news_lines = []
+        for i, news_item in enumerate(news_items):
+            title = news_item.get('title', '')
+            news_lines.append(json.dumps({
+                'id': i,
+                'title': title,
+                'source': news_item.get('source', ''),
+                'summary': news_item.get('summary', '')[:300],
+                'category': CATEGORY_NAMES.get(news_item.get('category', 'tech'), '科技'),
+                'translate': bool(title) and not has_chinese(title)
+            }, ensure_ascii=False))
+        
+        return BATCH_PROMPT_TEMPLATE.substitute(
+            count=len(news_items),
+            news_lines='\n'.join(news_lines),
+            target_name=LANGUAGE_NAMES.get(self.target_language, '简体中文')
+        )
+    
+    def _normalize_analysis(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """补全模型返回的分析结果字段"""
+        analysis_result = {
+            'core_point': analysis.get('core_point', '无法提取核心要点'),
+            'fund_signal': analysis.get('fund_signal', '不适用'),
+            'fund_details': analysis.get('fund_details', ''),
+            'dev_impact': analysis.get('dev_impact', '无明显影响'),
+            'relevance_score': analysis.get('relevance_score', 5),
+            'key_words': analysis.get('key_words', []),
+            'relevance': analysis.get('relevance', '待分析'),
+            'impact_level': analysis.get('impact_level', '中-待分析'),
+            'timeliness': analysis.get('timeliness', '待分析'),
+            'certainty': analysis.get('certainty', '中-待分析'),
+            'opportunity_type': analysis.get('opportunity_type', '不适用')
+        }
+        translated_title = str(analysis.get('translated_title') or '').strip()
+        if translated_title:
+            analysis_result['translated_title'] = translated_title
+        return analysis_result
     
     def analyze_news(self, news_item: Dict[str, Any]) -> Dict[str, Any]:
         """分析单条新闻"""
@@ -73,47 +391,35 @@ class ZhipuAnalyzer:
             logger.warning("未配置智谱AI API密钥，使用默认分析")
             return self._default_analysis(news_item)
         
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
-        }
+        cache_key = AnalysisCache.make_key(news_item, self.target_language)
+        cached = self.cache.get(cache_key)
+        if cached:
+            logger.info(f"命中分析缓存: {news_item.get('title', '')[:30]}")
+            return cached
         
         payload = {
             'model': self.model,
             'messages': [
                 {'role': 'user', 'content': self._build_prompt(news_item)}
             ],
-            'temperature': 0.7,
+            'temperature': ANALYSIS_TEMPERATURE,
+            'max_tokens': ANALYSIS_MAX_TOKENS,
+            'response_format': {'type': 'json_object'}
         }
         
         try:
-            response = requests.post(
-                ZHIPU_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            response = self._post(payload, timeout=30)
             
             if response.status_code == 200:
-                result = response.json()
+                result = json_loads(response.content)
                 content = result.get('choices', [{}])[0].get('message', {}).get('content', '')
                 
                 # 解析JSON
-                analysis = json.loads(content)
+                analysis = json_loads(content)
                 
-                return {
-                    'core_point': analysis.get('core_point', '无法提取核心要点'),
-                    'fund_signal': analysis.get('fund_signal', '不适用'),
-                    'fund_details': analysis.get('fund_details', ''),
-                    'dev_impact': analysis.get('dev_impact', '无明显影响'),
-                    'relevance_score': analysis.get('relevance_score', 5),
-                    'key_words': analysis.get('key_words', []),
-                    'relevance': analysis.get('relevance', '待分析'),
-                    'impact_level': analysis.get('impact_level', '中-待分析'),
-                    'timeliness': analysis.get('timeliness', '待分析'),
-                    'certainty': analysis.get('certainty', '中-待分析'),
-                    'opportunity_type': analysis.get('opportunity_type', '不适用')
-                }
+                analysis_result = self._normalize_analysis(analysis)
+                self.cache.set(cache_key, analysis_result)
+                return analysis_result
             else:
                 logger.error(f"API调用失败: {response.status_code} - {response.text}")
                 return self._default_analysis(news_item)
@@ -125,6 +431,70 @@ class ZhipuAnalyzer:
             logger.error(f"分析失败: {e}")
             return self._default_analysis(news_item)
     
+    def analyze_batch(self, news_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """在一次API调用中分析多条新闻，返回与输入顺序一致的分析结果"""
+        if not self.api_key:
+            logger.warning("未配置智谱AI API密钥，使用默认分析")
+            return [self._default_analysis(news_item) for news_item in news_items]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(news_items)
+        cache_keys = [AnalysisCache.make_key(news_item, self.target_language) for news_item in news_items]
+        pending = []
+        for i, cache_key in enumerate(cache_keys):
+            cached = self.cache.get(cache_key)
+            if cached:
+                logger.info(f"命中分析缓存: {news_items[i].get('title', '')[:30]}")
+                results[i] = cached
+            else:
+                pending.append(i)
+        
+        if len(pending) > 1:
+            payload = {
+                'model': self.model,
+                'messages': [
+                    {'role': 'user', 'content': self._build_batch_prompt([news_items[i] for i in pending])}
+                ],
+                'temperature': ANALYSIS_TEMPERATURE,
+                'max_tokens': ANALYSIS_MAX_TOKENS * len(pending),
+                'response_format': {'type': 'json_object'}
+            }
+            
+            try:
+                response = self._post(payload, timeout=60)
+                
+                if response.status_code == 200:
+                    result = json_loads(response.content)
+                    content = result.get('choices', [{}])[0].get('message', {}).get('content', '')
+                    
+                    # 按id合并批量结果
+                    by_id = {}
+                    for analysis in json_loads(content).get('results', []):
+                        if isinstance(analysis, dict) and str(analysis.get('id', '')).isdigit():
+                            by_id[int(analysis['id'])] = analysis
+                    
+                    for batch_id, i in enumerate(pending):
+                        if batch_id in by_id:
+                            results[i] = self._normalize_analysis(by_id[batch_id])
+                            self.cache.set(cache_keys[i], results[i])
+                else:
+                    logger.error(f"批量API调用失败: {response.status_code} - {response.text}")
+                    
+            except json.JSONDecodeError as e:
+                logger.error(f"批量结果JSON解析失败: {e}")
+            except Exception as e:
+                logger.error(f"批量分析失败: {e}")
+        
+        # 批量结果缺失的新闻回退为逐条分析，并发发出请求（总并发仍受信号量限制）
+        missing = [i for i, analysis in enumerate(results) if analysis is None]
+        if len(missing) > 1:
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                for i, analysis in zip(missing, executor.map(self.analyze_news, [news_items[i] for i in missing])):
+                    results[i] = analysis
+        elif missing:
+            results[missing[0]] = self.analyze_news(news_items[missing[0]])
+        
+        return results
+    
     def _default_analysis(self, news_item: Dict[str, Any]) -> Dict[str, Any]:
         """默认分析（当API不可用时）"""
         return {
@@ -147,48 +517,30 @@ class ZhipuAnalyzer:
             return None
         
         # 检查是否包含中文字符
-        has_chinese = any('\u4e00' <= char <= '\u9fff' for char in title)
-        if has_chinese:
+        if has_chinese(title):
             return None  # 已经是中文，不需要翻译
         
         if not self.api_key:
             logger.warning("未配置智谱AI API密钥，无法翻译")
             return None
         
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
-        }
-        
         # 根据目标语言设置翻译提示
-        lang_map = {
-            'zh-CN': '简体中文',
-            'zh-TW': '繁体中文', 
-            'en': '英语',
-            'ja': '日语',
-            'ko': '韩语'
-        }
-        target_name = lang_map.get(self.target_language, '简体中文')
+        target_name = LANGUAGE_NAMES.get(self.target_language, '简体中文')
         
         payload = {
             'model': self.model,
             'messages': [
                 {'role': 'user', 'content': f'请将以下标题翻译成{target_name}，只返回翻译结果，不要有任何解释或其他内容：\n\n{title}'}
             ],
-            'temperature': 0.3,
-            'max_tokens': 200
+            'temperature': TRANSLATE_TEMPERATURE,
+            'max_tokens': TRANSLATE_MAX_TOKENS
         }
         
         try:
-            response = requests.post(
-                ZHIPU_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=20
-            )
+            response = self._post(payload, timeout=20)
             
             if response.status_code == 200:
-                result = response.json()
+                result = json_loads(response.content)
                 translated = result.get('choices', [{}])[0].get('message', {}).get('content', '').strip()
                 return translated if translated else None
             else:
@@ -199,32 +551,60 @@ class ZhipuAnalyzer:
             logger.error(f"翻译失败: {e}")
             return None
     
+    def _merge_analysis(self, news: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """将分析结果与原始新闻合并，并替换译文标题"""
+        original_title = news.get('title', '')
+        
+        # 非中文标题优先使用分析结果中的译文，缺失时再单独翻译
+        translated_title = analysis.pop('translated_title', None)
+        if not translated_title and original_title and not has_chinese(original_title):
+            translated_title = self.translate_title(original_title)
+        if translated_title:
+            news['title'] = translated_title
+            news['original_title'] = original_title  # 保留原文
+        
+        # 合并原始新闻和分析结果
+        return {**news, **analysis}
+    
+    def _process_batch(self, news_batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """分析一批新闻，返回合并后的结果"""
+        analyses = self.analyze_batch(news_batch)
+        return [self._merge_analysis(news, analysis) for news, analysis in zip(news_batch, analyses)]
+    
+    def _process_skipped(self, news: Dict[str, Any]) -> Dict[str, Any]:
+        """预筛选未通过的新闻：使用默认分析并排在已分析新闻之后（不翻译标题，不产生API调用）"""
+        analysis = self._default_analysis(news)
+        analysis['relevance_score'] = 0
+        return {**news, **analysis}
+    
     def batch_analyze(self, news_list: List[Dict[str, Any]], max_items: int = 100) -> List[Dict[str, Any]]:
         """批量分析新闻"""
         analyzed_news = []
         
         logger.info(f"开始分析 {len(news_list)} 篇新闻...")
         
-        for i, news in enumerate(news_list):
-            logger.info(f"分析进度: {i+1}/{len(news_list)}")
-            
-            # 翻译非中文标题
-            original_title = news.get('title', '')
-            translated_title = self.translate_title(original_title)
-            if translated_title:
-                news['title'] = translated_title
-                news['original_title'] = original_title  # 保留原文
-            
-            analysis = self.analyze_news(news)
-            
-            # 合并原始新闻和分析结果
-            combined = {**news, **analysis}
-            analyzed_news.append(combined)
+        # 关键词预筛选，只把最有价值的新闻交给大模型
+        skipped = []
+        if len(news_list) > LLM_ANALYZE_LIMIT:
+            ranked = sorted(news_list, key=keyword_score, reverse=True)
+            news_list, skipped = ranked[:LLM_ANALYZE_LIMIT], ranked[LLM_ANALYZE_LIMIT:]
+            logger.info(f"关键词预筛选: {len(news_list)} 篇进入AI分析，{len(skipped)} 篇使用默认分析")
+        
+        # 每次API调用分析一批新闻，多批之间使用线程池并发处理
+        batches = [news_list[i:i + ANALYZE_BATCH_SIZE] for i in range(0, len(news_list), ANALYZE_BATCH_SIZE)]
+        executor = ThreadPoolExecutor(max_workers=ANALYZE_WORKERS)
+        try:
+            for merged in executor.map(self._process_batch, batches):
+                analyzed_news.extend(merged)
+                logger.info(f"分析进度: {len(analyzed_news)}/{len(news_list)}")
+        finally:
+            # 中断时取消尚未发出的批次，避免继续消耗API额度
+            executor.shutdown(wait=True, cancel_futures=True)
         
-        # 按相关性评分排序，取前max_items条
-        analyzed_news.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
+        analyzed_news.extend(map(self._process_skipped, skipped))
         
-        return analyzed_news[:max_items]
+        # 按相关性评分取前max_items条（分析结果均包含relevance_score）
+        return heapq.nlargest(max_items, analyzed_news, key=itemgetter('relevance_score'))
 
 
 if __name__ == '__main__':
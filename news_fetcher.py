@@ -6,12 +6,22 @@
 """
 
 import os
+import re
+import html
 import json
+import math
+import zlib
+import random
+import hashlib
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from typing import List, Dict, Any, Optional, Tuple
 import feedparser
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 
 # 配置日志
@@ -64,132 +74,375 @@ NEWS_SOURCES = {
 MAX_NEWS_PER_SOURCE = 15
 MAX_TOTAL_NEWS = 100  # 扩展到100篇
 
+# 并发抓取配置
+FETCH_WORKERS = 16
+FETCH_TIMEOUT = 15
+
+# 标题相似度去重配置 (MinHash LSH)
+SIMILARITY_THRESHOLD = 0.7
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 64  # 每个band 1行：Jaccard 为 J 的标题漏召回概率 (1-J)^64，短标题被长标题包含（J≈0.2）时也几乎必然召回
+SHINGLE_SIZE = 3
+
+# HTML清理配置：短文本直接用正则去标签，长文本交给 lxml 解析
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+# script/style 的内容不是正文，去标签前连同内容一起删除（与 lxml 路径的 get_text 一致）
+SCRIPT_STYLE_RE = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+SHORT_HTML_LENGTH = 200
+
+# RSS条件请求缓存 (ETag / Last-Modified)
+FEED_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feed_cache.json')
+
+# 跨运行的已报道标题记录（布隆过滤器）
+SEEN_TITLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seen_titles.bloom')
+SEEN_TITLES_CAPACITY = 100000
+SEEN_TITLES_ERROR_RATE = 0.001
+
+
+class MinHashLSH:
+    """基于字符 n-gram MinHash 的局部敏感哈希索引，用于近似标题去重
+    
+    LSH 分桶只负责快速召回候选，候选再按 n-gram 重叠系数精确校验。召回是概率性的：
+    每个 band 只有 1 行，Jaccard 很低的包含关系（短标题 + 长后缀）也能以极高概率召回，
+    但不保证与逐对比较完全一致。
+    """
+    
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, num_perm: int = MINHASH_PERMUTATIONS,
+                 bands: int = LSH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(42)
+        # 用随机掩码异或代替 (a*x+b) mod p 置换，配合 map 让取最小值的循环在C层完成
+        self._masks = [rng.getrandbits(32) for _ in range(num_perm)]
+        self._buckets = [{} for _ in range(bands)]
+    
+    def shingles(self, text: str) -> frozenset:
+        """将文本切分为字符 n-gram 集合"""
+        text = text.lower().replace(' ', '')
+        if len(text) <= SHINGLE_SIZE:
+            return frozenset([text])
+        return frozenset(text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+    
+    def _band_keys(self, shingles: frozenset) -> List[tuple]:
+        hashes = [zlib.crc32(sh.encode('utf-8')) for sh in shingles]
+        sig = [min(map(mask.__xor__, hashes)) for mask in self._masks]
+        rows = self.rows
+        return [tuple(sig[i * rows:(i + 1) * rows]) for i in range(self.bands)]
+    
+    def add_if_new(self, text: str) -> bool:
+        """若索引中没有相似文本则收录并返回 True，否则返回 False"""
+        shingles = self.shingles(text)
+        keys = self._band_keys(shingles)
+        # 同一候选可能落在多个 band 中，按对象去重后只校验一次
+        candidates = {id(other): other for bucket, key in zip(self._buckets, keys) for other in bucket.get(key, ())}
+        for other in candidates.values():
+            overlap = len(shingles & other) / min(len(shingles), len(other))
+            if overlap >= self.threshold:
+                return False
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(shingles)
+        return True
+
+
+class BloomFilter:
+    """定长位数组布隆过滤器"""
+    
+    def __init__(self, capacity: int = SEEN_TITLES_CAPACITY, error_rate: float = SEEN_TITLES_ERROR_RATE):
+        self.capacity = capacity
+        self.num_bits = int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+    
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+    
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+    
+    def merge(self, other: 'BloomFilter') -> None:
+        """合并另一个同规格过滤器"""
+        self.bits = bytearray(a | b for a, b in zip(self.bits, other.bits))
+        self.count += other.count
+
+
+class SeenTitleHistory:
+    """跨运行持久化的已报道新闻（标题及规范化链接）
+    
+    history 保存今天之前报道过的新闻，today 保存今天新增的标题；只有 history 用于过滤，
+    因此同一天重复运行仍能拿到当天的新闻。日期变化时 today 并入 history，
+    history 超出容量后清空重建，避免误判率持续上升。
+    """
+    
+    def __init__(self, path: str = SEEN_TITLES_PATH):
+        self.path = path
+        self.history = BloomFilter()
+        self.today = BloomFilter()
+        self._load()
+    
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'rb') as f:
+                header = json.loads(f.readline())
+                size = len(self.history.bits)
+                history_bits, today_bits = f.read(size), f.read(size)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取已报道标题记录失败: {e}")
+            return
+        if header.get('num_bits') != self.history.num_bits or len(today_bits) != len(self.today.bits):
+            logger.warning("已报道标题记录格式不匹配，已忽略")
+            return
+        self.history.bits, self.history.count = bytearray(history_bits), header.get('history_count', 0)
+        self.today.bits, self.today.count = bytearray(today_bits), header.get('today_count', 0)
+        if header.get('date') != datetime.now().strftime('%Y-%m-%d'):
+            self.history.merge(self.today)
+            self.today = BloomFilter()
+        if self.history.count > self.history.capacity:
+            self.history = BloomFilter()
+    
+    def __contains__(self, title: str) -> bool:
+        return title in self.history
+    
+    def add(self, title: str) -> None:
+        if title not in self.today:
+            self.today.add(title)
+    
+    def save(self) -> None:
+        header = {
+            'date': datetime.now().strftime('%Y-%m-%d'),
+            'num_bits': self.history.num_bits,
+            'history_count': self.history.count,
+            'today_count': self.today.count
+        }
+        try:
+            with open(self.path, 'wb') as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                f.write(self.history.bits)
+                f.write(self.today.bits)
+        except OSError as e:
+            logger.warning(f"保存已报道标题记录失败: {e}")
+
 
 class NewsFetcher:
     """新闻获取器"""
     
     def __init__(self):
         self.seen_titles = set()
+        self.seen_ids = set()
+        self._title_index = MinHashLSH()
+        # 共享连接池，复用 TCP/TLS 连接
+        self._session = requests.Session()
+        # 沿用 feedparser 的 User-Agent，部分站点会拦截 python-requests 默认 UA
+        self._session.headers['User-Agent'] = feedparser.USER_AGENT
+        adapter = HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS * 2)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self.feed_cache = self._read_feed_cache()
+        self.seen_history = SeenTitleHistory()
     
-    def fetch_feed(self, url: str, category: str) -> List[Dict[str, Any]]:
-        """获取单个RSS源的内容"""
-        articles = []
+    def _read_feed_cache(self) -> Dict[str, Any]:
+        """读取上次运行保存的RSS缓存"""
         try:
-            logger.info(f"正在获取: {url}")
-            feed = feedparser.parse(url)
+            with open(FEED_CACHE_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取RSS缓存失败: {e}")
+            return {}
+    
+    def save_feed_cache(self) -> None:
+        """保存RSS缓存，供下次运行发起条件请求"""
+        try:
+            with open(FEED_CACHE_PATH, 'w', encoding='utf-8') as f:
+                json.dump(self.feed_cache, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"保存RSS缓存失败: {e}")
+    
+    def _load_feed(self, url: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """下载并解析RSS源，源未更新(304)时直接复用上次缓存的条目"""
+        cached = self.feed_cache.get(url, {})
+        headers = {}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('modified'):
+            headers['If-Modified-Since'] = cached['modified']
+        
+        response = self._session.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+        if response.status_code == 304 and 'entries' in cached:
+            logger.info(f"源未更新，使用缓存: {url}")
+            return cached.get('source', url), cached['entries']
+        response.raise_for_status()
+        # 摘要会由 _clean_html 统一清理，其中的相对地址也无需转换，关闭 feedparser 的对应处理；
+        # 传入响应头（feedparser 要求小写键）和最终地址，使 Content-Type 中的字符集生效、相对 <link> 按源地址解析
+        response_headers = {key.lower(): value for key, value in response.headers.items()}
+        response_headers['content-location'] = response.url
+        feed = feedparser.parse(response.content, response_headers=response_headers,
+                                resolve_relative_uris=False, sanitize_html=False)
+        
+        entries = []
+        for entry in feed.entries[:MAX_NEWS_PER_SOURCE]:
+            # 提取文章信息
+            published = entry.get('published', entry.get('updated', ''))
+            
+            # 解析发布时间（feedparser 已解析为 UTC struct_time）
+            parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+            pub_date = datetime(*parsed[:6], tzinfo=timezone.utc) if parsed else self._parse_date(published)
             
-            for entry in feed.entries[:MAX_NEWS_PER_SOURCE]:
-                # 提取文章信息
-                title = entry.get('title', '').strip()
-                link = entry.get('link', '')
-                published = entry.get('published', entry.get('updated', ''))
-                summary = entry.get('summary', entry.get('description', ''))
-                
+            entries.append({
+                'title': entry.get('title', '').strip(),
+                'link': entry.get('link', ''),
+                'guid': entry.get('id', ''),
+                'published': published,
+                'timestamp': pub_date.timestamp() if pub_date else None,
                 # 清理HTML标签
-                summary = self._clean_html(summary)
-                
-                # 去重检查
-                if title.lower() in self.seen_titles:
-                    continue
-                
-                # 简单相似度去重
-                is_duplicate = False
-                for seen in self.seen_titles:
-                    if self._is_similar(title, seen):
-                        is_duplicate = True
-                        break
-                
-                if is_duplicate:
-                    continue
-                
-                self.seen_titles.add(title.lower())
-                
-                # 解析发布时间
-                pub_date = self._parse_date(published)
-                
-                # 过滤24小时内的新闻
-                if pub_date:
-                    time_diff = datetime.now(pub_date.tzinfo) - pub_date
-                    if time_diff > timedelta(hours=24):
-                        continue
-                
-                articles.append({
-                    'title': title,
-                    'link': link,
-                    'summary': summary[:500],  # 限制摘要长度
-                    'published': published,
-                    'category': category,
-                    'source': feed.feed.get('title', url)
-                })
-                
+                'summary': self._clean_html(entry.get('summary', entry.get('description', '')))
+            })
+        
+        source = feed.feed.get('title', url)
+        self.feed_cache[url] = {
+            'etag': response.headers.get('ETag'),
+            'modified': response.headers.get('Last-Modified'),
+            'source': source,
+            'entries': entries
+        }
+        return source, entries
+    
+    def _download_feed(self, url: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """下载、解析并清理单个RSS源（在线程池中执行，不触碰去重状态），失败时返回空条目"""
+        try:
+            logger.info(f"正在获取: {url}")
+            return self._load_feed(url)
         except Exception as e:
             logger.error(f"获取 {url} 失败: {e}")
+            return url, []
+    
+    def _select_articles(self, source: str, entries: List[Dict[str, Any]],
+                         category: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """对单个源的条目做去重和24小时过滤（按 NEWS_SOURCES 顺序串行调用，结果确定），
+        返回 (链接/GUID, 文章) 列表，供最终入选时记录已报道"""
+        articles = []
+        cutoff = (datetime.now(timezone.utc) - timedelta(hours=24)).timestamp()
+        
+        for entry in entries:
+            title = entry['title']
+            # 链接全局唯一，优先用于去重；没有链接时退回使用GUID
+            item_id = self._normalize_link(entry['link']) or entry.get('guid', '')
+            
+            # 跳过之前已报道过的新闻
+            if title.lower() in self.seen_history or (item_id and f"id:{item_id}" in self.seen_history):
+                continue
+            
+            # 先按链接/GUID快速去重，再做标题相似度检查
+            if item_id:
+                if item_id in self.seen_ids:
+                    continue
+                self.seen_ids.add(item_id)
+            
+            if title.lower() in self.seen_titles:
+                continue
+            
+            # 相似度去重
+            if not self._title_index.add_if_new(title):
+                continue
+            
+            self.seen_titles.add(title.lower())
+            
+            # 过滤24小时内的新闻
+            if entry['timestamp'] is not None and entry['timestamp'] < cutoff:
+                continue
+            
+            articles.append((item_id, {
+                'title': title,
+                'link': entry['link'],
+                'summary': entry['summary'][:500],  # 限制摘要长度
+                'published': entry['published'],
+                'category': category,
+                'source': source
+            }))
         
         return articles
     
+    def fetch_feed(self, url: str, category: str) -> List[Dict[str, Any]]:
+        """获取单个RSS源的内容"""
+        source, entries = self._download_feed(url)
+        return [article for _, article in self._select_articles(source, entries, category)]
+    
     def _clean_html(self, text: str) -> str:
         """清理HTML标签"""
-        soup = BeautifulSoup(text, 'html.parser')
+        if not text:
+            return ''
+        if '<' not in text and '&' not in text:
+            return text.strip()
+        if len(text) < SHORT_HTML_LENGTH:
+            return html.unescape(HTML_TAG_RE.sub('', SCRIPT_STYLE_RE.sub('', text))).strip()
+        soup = BeautifulSoup(text, 'lxml')
         return soup.get_text().strip()
     
-    def _parse_date(self, date_str: str) -> datetime:
-        """解析日期字符串"""
+    def _normalize_link(self, link: str) -> str:
+        """规范化文章链接：忽略协议、锚点和 utm_* 跟踪参数"""
+        if not link:
+            return ''
+        parts = urlsplit(link.strip())
+        query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                           if not k.lower().startswith('utm_')])
+        normalized = parts.netloc.lower() + parts.path.rstrip('/')
+        return f"{normalized}?{query}" if query else normalized
+    
+    def _parse_date(self, date_str: str) -> Optional[datetime]:
+        """解析 RFC 2822 日期字符串（feedparser 未能解析时的兜底）"""
         if not date_str:
             return None
-        
-        # 尝试多种日期格式
-        formats = [
-            '%a, %d %b %Y %H:%M:%S %z',
-            '%Y-%m-%dT%H:%M:%S%z',
-            '%Y-%m-%d %H:%M:%S',
-            '%Y-%m-%d',
-        ]
-        
-        for fmt in formats:
-            try:
-                # 移除星期几的中文
-                date_str = date_str.replace('GMT', '+0000')
-                return datetime.strptime(date_str[:len('2024-01-01T12:00:00+0000')], fmt.replace('%z', '+0000'))
-            except:
-                try:
-                    return datetime.strptime(date_str[:len('2024-01-01T12:00:00')], fmt.replace('%z', ''))
-                except:
-                    continue
-        
-        return None
-    
-    def _is_similar(self, title1: str, title2: str, threshold: float = 0.7) -> bool:
-        """简单的相似度检查"""
-        title1 = title1.lower().replace(' ', '')
-        title2 = title2.lower().replace(' ', '')
-        
-        if title1 in title2 or title2 in title1:
-            return True
-        
-        # 计算字符集重叠
-        set1 = set(title1)
-        set2 = set(title2)
-        if len(set1) == 0 or len(set2) == 0:
-            return False
-        
-        overlap = len(set1 & set2) / min(len(set1), len(set2))
-        return overlap > threshold
+        try:
+            pub_date = parsedate_to_datetime(date_str)
+        except (TypeError, ValueError):
+            return None
+        return pub_date if pub_date.tzinfo else pub_date.replace(tzinfo=timezone.utc)
     
     def fetch_all_news(self) -> List[Dict[str, Any]]:
         """获取所有来源的新闻"""
-        all_articles = []
+        candidates = []
+        tasks = [(category, source) for category, sources in NEWS_SOURCES.items() for source in sources]
         
-        for category, sources in NEWS_SOURCES.items():
-            for source in sources:
-                articles = self.fetch_feed(source, category)
-                all_articles.extend(articles)
+        # 各源互相独立且以网络等待为主，并发抓取
+        executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+        try:
+            # 线程只负责下载解析；map 按 NEWS_SOURCES 顺序返回，去重在此串行进行，
+            # 重复条目总是保留先出现的源及其分类，与请求完成的先后无关
+            results = executor.map(self._download_feed, [source for _, source in tasks])
+            for (category, source), (feed_source, entries) in zip(tasks, results):
+                articles = self._select_articles(feed_source, entries, category)
+                candidates.extend(articles)
                 logger.info(f"从 {category}/{source} 获取了 {len(articles)} 篇文章")
+        finally:
+            # 中断（如 Ctrl+C）时取消尚未开始的请求，只等待进行中的请求
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        self.save_feed_cache()
         
         # 按发布时间排序
-        all_articles.sort(key=lambda x: x.get('published', ''), reverse=True)
+        candidates.sort(key=lambda x: x[1].get('published', ''), reverse=True)
+        
+        # 只有最终返回的新闻才记为已报道，被去重、时间过滤或数量上限淘汰的不记录
+        for item_id, article in candidates[:MAX_TOTAL_NEWS]:
+            if item_id:
+                self.seen_history.add(f"id:{item_id}")
+            self.seen_history.add(article['title'].lower())
+        self.seen_history.save()
         
-        logger.info(f"共获取 {len(all_articles)} 篇新闻")
-        return all_articles[:MAX_TOTAL_NEWS]
+        logger.info(f"共获取 {len(candidates)} 篇新闻")
+        return [article for _, article in candidates[:MAX_TOTAL_NEWS]]
 
 
 if __name__ == '__main__':
@@ -8,11 +8,28 @@
 import os
 import json
 import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from datetime import datetime
-from typing import List, Dict, Any
+from html import escape
+from typing import List, Dict, Any, Tuple, Optional, Iterator
+
+try:
+    # orjson 序列化更快且直接输出UTF-8，未安装时回退到标准库
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# 报告文件写缓冲大小（常见报告一次系统调用即可写完）
+WRITE_BUFFER_SIZE = 1 << 20
+
+# 报告中分类的固定输出顺序
+CATEGORY_ORDER = ('tech', 'science', 'society', 'international')
+VALID_CATEGORIES = frozenset(CATEGORY_ORDER)
+
 # 分类emoji映射
 CATEGORY_ICONS = {
     'tech': '🚀',
@@ -35,42 +52,38 @@ CATEGORY_COLORS = {
     'international': '#059669'
 }
 
+# 基金建议 -> 卡片样式类（仅预置固定取值；大模型生成的自由文本不缓存）
+FUND_CLASS_TABLE = {
+    '': 'fund',
+    '不适用': 'fund',
+    '需人工分析': 'fund',
+    '观望': 'fund hold'
+}
 
-class ReportGenerator:
-    """新闻简报生成器"""
-    
-    def __init__(self):
-        self.today = datetime.now().strftime('%Y-%m-%d')
-    
-    def generate_html(self, news_list: List[Dict[str, Any]]) -> str:
-        """生成杂志风格HTML格式的简报"""
-        
-        # 按分类分组
-        categorized = self._categorize_news(news_list)
-        
-        # 统计
-        stats = {}
-        for cat in ['tech', 'science', 'society', 'international']:
-            stats[cat] = len(categorized.get(cat, []))
-        
-        # 构建HTML
-        html = f'''<!DOCTYPE html>
+# 关键词标签（绑定的 format 方法，可直接用于 map）
+KEYWORD_TEMPLATE = '<span class="keyword">{}</span>'.format
+
+# 页面头部模板（仅标题中的日期需要填充）
+REPORT_HEAD_TEMPLATE = '''<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>每日重点新闻简报 - {self.today}</title>
+    <title>每日重点新闻简报 - {today}</title>
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Noto+Serif+SC:wght@400;600;700&family=Noto+Sans+SC:wght@300;400;500;600&display=swap" rel="stylesheet">
-    <style>
-        * {{
+'''
+
+# 报告样式（不含插值，模块加载时构建一次）
+REPORT_CSS = '''    <style>
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        :root {{
+        :root {
             --bg-paper: #FAFAF9;
             --text-primary: #18181B;
             --text-secondary: #52525B;
@@ -84,30 +97,30 @@ class ReportGenerator:
             --fund-hold: #F59E0B;
             --border-light: #E4E4E7;
             --card-bg: #FFFFFF;
-        }}
+        }
         
-        body {{
+        body {
             font-family: 'Noto Sans SC', -apple-system, BlinkMacSystemFont, sans-serif;
             background: var(--bg-paper);
             color: var(--text-primary);
             line-height: 1.6;
             min-height: 100vh;
-        }}
+        }
         
-        .container {{
+        .container {
             max-width: 1200px;
             margin: 0 auto;
             padding: 0 20px;
-        }}
+        }
         
         /* 杂志头版 */
-        .masthead {{
+        .masthead {
             padding: 40px 0 30px;
             border-bottom: 3px solid var(--text-primary);
             margin-bottom: 40px;
-        }}
+        }
         
-        .masthead-top {{
+        .masthead-top {
             display: flex;
             justify-content: space-between;
             align-items: center;
@@ -115,36 +128,36 @@ class ReportGenerator:
             font-size: 12px;
             color: var(--text-muted);
             letter-spacing: 1px;
-        }}
+        }
         
-        .masthead-title {{
+        .masthead-title {
             font-family: 'Noto Serif SC', serif;
             font-size: clamp(32px, 6vw, 56px);
             font-weight: 700;
             text-align: center;
             letter-spacing: 8px;
             color: var(--text-primary);
-        }}
+        }
         
-        .masthead-subtitle {{
+        .masthead-subtitle {
             text-align: center;
             font-size: 14px;
             color: var(--text-secondary);
             margin-top: 8px;
             letter-spacing: 2px;
-        }}
+        }
         
         /* 分类导航 */
-        .category-nav {{
+        .category-nav {
             display: flex;
             gap: 12px;
             flex-wrap: wrap;
             justify-content: center;
             margin-bottom: 40px;
             padding: 0 20px;
-        }}
+        }
         
-        .category-btn {{
+        .category-btn {
             padding: 10px 24px;
             border: 1px solid var(--border-light);
             background: var(--card-bg);
@@ -154,25 +167,25 @@ class ReportGenerator:
             transition: all 0.3s ease;
             border-radius: 4px;
             font-family: inherit;
-        }}
+        }
         
-        .category-btn:hover {{
+        .category-btn:hover {
             border-color: var(--text-primary);
-        }}
+        }
         
-        .category-btn.active {{
+        .category-btn.active {
             background: var(--text-primary);
             color: white;
             border-color: var(--text-primary);
-        }}
+        }
         
-        .category-btn[data-cat="tech"].active {{ background: var(--accent-tech); border-color: var(--accent-tech); }}
-        .category-btn[data-cat="science"].active {{ background: var(--accent-science); border-color: var(--accent-science); }}
-        .category-btn[data-cat="society"].active {{ background: var(--accent-society); border-color: var(--accent-society); }}
-        .category-btn[data-cat="international"].active {{ background: var(--accent-international); border-color: var(--accent-international); }}
+        .category-btn[data-cat="tech"].active { background: var(--accent-tech); border-color: var(--accent-tech); }
+        .category-btn[data-cat="science"].active { background: var(--accent-science); border-color: var(--accent-science); }
+        .category-btn[data-cat="society"].active { background: var(--accent-society); border-color: var(--accent-society); }
+        .category-btn[data-cat="international"].active { background: var(--accent-international); border-color: var(--accent-international); }
         
         /* 统计栏 */
-        .stats-bar {{
+        .stats-bar {
             display: flex;
             justify-content: center;
             gap: 40px;
@@ -180,36 +193,36 @@ class ReportGenerator:
             padding: 20px;
             background: var(--card-bg);
             border: 1px solid var(--border-light);
-        }}
+        }
         
-        .stat-item {{
+        .stat-item {
             text-align: center;
-        }}
+        }
         
-        .stat-num {{
+        .stat-num {
             font-family: 'Noto Serif SC', serif;
             font-size: 32px;
             font-weight: 700;
             color: var(--text-primary);
-        }}
+        }
         
-        .stat-label {{
+        .stat-label {
             font-size: 12px;
             color: var(--text-muted);
             text-transform: uppercase;
             letter-spacing: 1px;
             margin-top: 4px;
-        }}
+        }
         
         /* 新闻卡片网格 */
-        .news-grid {{
+        .news-grid {
             display: grid;
             grid-template-columns: repeat(auto-fill, minmax(340px, 1fr));
             gap: 24px;
             margin-bottom: 60px;
-        }}
+        }
         
-        .news-card {{
+        .news-card {
             background: var(--card-bg);
             border: 1px solid var(--border-light);
             padding: 24px;
@@ -217,26 +230,26 @@ class ReportGenerator:
             display: flex;
             flex-direction: column;
             cursor: pointer;
-        }}
+        }
         
-        .news-card:hover {{
+        .news-card:hover {
             transform: translateY(-4px);
             border-color: var(--text-primary);
             box-shadow: 0 12px 40px rgba(0,0,0,0.08);
-        }}
+        }
         
-        .news-card.hidden {{
+        .news-card.hidden {
             display: none;
-        }}
+        }
         
-        .card-header {{
+        .card-header {
             display: flex;
             justify-content: space-between;
             align-items: flex-start;
             margin-bottom: 16px;
-        }}
+        }
         
-        .category-tag {{
+        .category-tag {
             font-size: 11px;
             font-weight: 600;
             text-transform: uppercase;
@@ -244,31 +257,31 @@ class ReportGenerator:
             padding: 4px 10px;
             border-radius: 2px;
             color: white;
-        }}
+        }
         
-        .category-tag.tech {{ background: var(--accent-tech); }}
-        .category-tag.science {{ background: var(--accent-science); }}
-        .category-tag.society {{ background: var(--accent-society); }}
-        .category-tag.international {{ background: var(--accent-international); }}
+        .category-tag.tech { background: var(--accent-tech); }
+        .category-tag.science { background: var(--accent-science); }
+        .category-tag.society { background: var(--accent-society); }
+        .category-tag.international { background: var(--accent-international); }
         
-        .relevance-score {{
+        .relevance-score {
             font-size: 11px;
             color: var(--text-muted);
             background: var(--bg-paper);
             padding: 3px 8px;
             border-radius: 2px;
-        }}
+        }
         
-        .card-title {{
+        .card-title {
             font-family: 'Noto Serif SC', serif;
             font-size: 18px;
             font-weight: 600;
             line-height: 1.5;
             margin-bottom: 16px;
             color: var(--text-primary);
-        }}
+        }
         
-        .core-point {{
+        .core-point {
             font-size: 14px;
             color: var(--text-secondary);
             padding: 12px 16px;
@@ -276,77 +289,77 @@ class ReportGenerator:
             border-left: 3px solid var(--text-primary);
             margin-bottom: 16px;
             line-height: 1.7;
-        }}
+        }
         
-        .insight-section {{
+        .insight-section {
             margin-top: auto;
-        }}
+        }
         
-        .insight-row {{
+        .insight-row {
             display: flex;
             gap: 12px;
             margin-bottom: 12px;
-        }}
+        }
         
-        .insight-box {{
+        .insight-box {
             flex: 1;
             padding: 12px;
             border-radius: 4px;
             font-size: 13px;
-        }}
+        }
         
-        .insight-box.fund {{
+        .insight-box.fund {
             background: linear-gradient(135deg, #ECFDF5 0%, #D1FAE5 100%);
             border: 1px solid #A7F3D0;
-        }}
+        }
         
-        .insight-box.fund.sell {{
+        .insight-box.fund.sell {
             background: linear-gradient(135deg, #FEF2F2 0%, #FEE2E2 100%);
             border: 1px solid #FECACA;
-        }}
+        }
         
-        .insight-box.fund.hold {{
+        .insight-box.fund.hold {
             background: linear-gradient(135deg, #FFFBEB 0%, #FEF3C7 100%);
             border: 1px solid #FDE68A;
-        }}
+        }
         
-        .insight-box.dev {{
+        .insight-box.dev {
             background: #F4F4F5;
             border: 1px solid var(--border-light);
-        }}
+        }
         
-        .insight-label {{
+        .insight-label {
             font-size: 10px;
             font-weight: 600;
             text-transform: uppercase;
             letter-spacing: 1px;
             margin-bottom: 4px;
             opacity: 0.7;
-        }}
+        }
         
-        .insight-content {{
+        .insight-content {
             font-weight: 500;
             line-height: 1.5;
-        }}
+        }
         
-        .keywords {{
+        .keywords {
             display: flex;
             flex-wrap: wrap;
             gap: 6px;
             margin-top: 16px;
             padding-top: 16px;
             border-top: 1px solid var(--border-light);
-        }}
+        }
         
-        .keyword {{
+        .keyword {
             font-size: 11px;
             padding: 3px 8px;
             background: var(--bg-paper);
             color: var(--text-secondary);
             border-radius: 2px;
-        }}
+        }
         
-        .source-link {{
+        .source-link {
             display: flex;
             align-items: center;
             gap: 6px;
@@ -355,22 +368,22 @@ class ReportGenerator:
             color: var(--text-muted);
             text-decoration: none;
             transition: color 0.2s;
-        }}
+        }
         
-        .source-link:hover {{
+        .source-link:hover {
             color: var(--accent-tech);
-        }}
+        }
         
         /* 底部 */
-        .footer {{
+        .footer {
             text-align: center;
             padding: 40px 20px;
             border-top: 1px solid var(--border-light);
             color: var(--text-muted);
             font-size: 13px;
-        }}
+        }
         
-        .disclaimer {{
+        .disclaimer {
             max-width: 600px;
             margin: 0 auto 20px;
             padding: 16px;
@@ -378,30 +391,30 @@ class ReportGenerator:
             border: 1px solid #FDE68A;
             font-size: 12px;
             color: #92400E;
-        }}
+        }
         
         /* 响应式 */
-        @media (max-width: 768px) {{
-            .masthead-title {{
+        @media (max-width: 768px) {
+            .masthead-title {
                 letter-spacing: 4px;
-            }}
+            }
             
-            .stats-bar {{
+            .stats-bar {
                 flex-wrap: wrap;
                 gap: 20px;
-            }}
+            }
             
-            .news-grid {{
+            .news-grid {
                 grid-template-columns: 1fr;
-            }}
+            }
             
-            .insight-row {{
+            .insight-row {
                 flex-direction: column;
-            }}
-        }}
+            }
+        }
         
         /* 弹窗样式 */
-        .modal-overlay {{
+        .modal-overlay {
             display: none;
             position: fixed;
             top: 0;
@@ -413,11 +426,11 @@ class ReportGenerator:
             justify-content: center;
             align-items: center;
             padding: 20px;
-        }}
+        }
         
-        .modal-overlay.active {{ display: flex; }}
+        .modal-overlay.active { display: flex; }
         
-        .modal-content {{
+        .modal-content {
             background: white;
             border-radius: 12px;
             max-width: 900px;
@@ -427,27 +440,27 @@ class ReportGenerator:
             display: flex;
             flex-direction: column;
             box-shadow: 0 25px 50px -12px rgba(0, 0, 0, 0.25);
-        }}
+        }
         
-        .modal-header {{
+        .modal-header {
             padding: 20px 24px;
             border-bottom: 1px solid var(--border-light);
             display: flex;
             justify-content: space-between;
             align-items: center;
             background: var(--bg-paper);
-        }}
+        }
         
-        .modal-title {{
+        .modal-title {
             font-family: 'Noto Serif SC', serif;
             font-size: 18px;
             font-weight: 600;
             color: var(--text-primary);
             flex: 1;
             padding-right: 20px;
-        }}
+        }
         
-        .modal-close {{
+        .modal-close {
             width: 32px;
             height: 32px;
             border: none;
@@ -461,26 +474,26 @@ class ReportGenerator:
             color: var(--text-secondary);
             transition: all 0.2s;
             flex-shrink: 0;
-        }}
+        }
         
-        .modal-close:hover {{ background: var(--text-primary); color: white; }}
+        .modal-close:hover { background: var(--text-primary); color: white; }
         
-        .modal-body {{ flex: 1; overflow-y: auto; padding: 0; }}
-        .modal-body iframe {{ width: 100%; height: 75vh; border: none; }}
+        .modal-body { flex: 1; overflow-y: auto; padding: 0; }
+        .modal-body iframe { width: 100%; height: 75vh; border: none; }
         
-        .modal-footer {{
+        .modal-footer {
             padding: 16px 24px;
             border-top: 1px solid var(--border-light);
             display: flex;
             justify-content: space-between;
             align-items: center;
             background: var(--bg-paper);
-        }}
+        }
         
-        .modal-source {{ font-size: 13px; color: var(--text-muted); }}
-        .modal-source a {{ color: var(--accent-tech); text-decoration: none; }}
+        .modal-source { font-size: 13px; color: var(--text-muted); }
+        .modal-source a { color: var(--accent-tech); text-decoration: none; }
         
-        .btn-open-original {{
+        .btn-open-original {
             padding: 8px 16px;
             background: var(--text-primary);
             color: white;
@@ -489,43 +502,46 @@ class ReportGenerator:
             font-size: 13px;
             cursor: pointer;
             transition: all 0.2s;
-        }}
+        }
         
-        .btn-open-original:hover {{ background: var(--accent-tech); }}
+        .btn-open-original:hover { background: var(--accent-tech); }
         
         /* 增强分析维度样式 */
-        .analysis-dimensions {{
+        .analysis-dimensions {
             display: grid;
             grid-template-columns: repeat(2, 1fr);
             gap: 8px;
             margin-top: 12px;
             padding-top: 12px;
             border-top: 1px solid var(--border-light);
-        }}
+        }
         
-        .dimension-item {{
+        .dimension-item {
             font-size: 11px;
             padding: 6px 8px;
             background: #F8FAFC;
             border-radius: 4px;
             border-left: 2px solid var(--accent-tech);
-        }}
+        }
         
-        .dimension-label {{ font-weight: 600; color: var(--text-secondary); margin-bottom: 2px; }}
-        .original-title {{ font-size: 12px; color: var(--text-muted); font-style: italic; margin-top: 4px; }}
+        .dimension-label { font-weight: 600; color: var(--text-secondary); margin-bottom: 2px; }
+        .original-title { font-size: 12px; color: var(--text-muted); font-style: italic; margin-top: 4px; }
         
-        @media (max-width: 768px) {{
-            .modal-content {{ max-height: 95vh; }}
-            .modal-body iframe {{ height: 60vh; }}
-            .analysis-dimensions {{ grid-template-columns: 1fr; }}
-        }}
+        @media (max-width: 768px) {
+            .modal-content { max-height: 95vh; }
+            .modal-body iframe { height: 60vh; }
+            .analysis-dimensions { grid-template-columns: 1fr; }
+        }
     </style>
-</head>
+'''
+
+# 页面主体开头：刊头、分类导航与统计栏
+REPORT_BODY_TEMPLATE = '''</head>
 <body>
     <header class="masthead">
         <div class="container">
             <div class="masthead-top">
-                <span>{datetime.now().strftime('%Y-%m-%d')}</span>
+                <span>{date}</span>
                 <span>每日更新</span>
             </div>
             <h1 class="masthead-title">每日简报</h1>
@@ -546,23 +562,23 @@ class ReportGenerator:
         <!-- 统计 -->
         <div class="stats-bar">
             <div class="stat-item">
-                <div class="stat-num">{stats.get('tech', 0)}</div>
+                <div class="stat-num">{tech}</div>
                 <div class="stat-label">科技</div>
             </div>
             <div class="stat-item">
-                <div class="stat-num">{stats.get('science', 0)}</div>
+                <div class="stat-num">{science}</div>
                 <div class="stat-label">科学</div>
             </div>
             <div class="stat-item">
-                <div class="stat-num">{stats.get('society', 0)}</div>
+                <div class="stat-num">{society}</div>
                 <div class="stat-label">社会</div>
             </div>
             <div class="stat-item">
-                <div class="stat-num">{stats.get('international', 0)}</div>
+                <div class="stat-num">{international}</div>
                 <div class="stat-label">国际</div>
             </div>
             <div class="stat-item">
-                <div class="stat-num">{len(news_list)}</div>
+                <div class="stat-num">{total}</div>
                 <div class="stat-label">总计</div>
             </div>
         </div>
@@ -570,43 +586,30 @@ class ReportGenerator:
         <!-- 新闻列表 -->
         <div class="news-grid">
 '''
-        
-        # 添加新闻卡片
-        for i, item in enumerate(news_list):
-            category = item.get('category', 'tech')
-            category_name = CATEGORY_NAMES.get(category, category)
-            
-            # 基金建议样式
-            fund_signal = item.get('fund_signal', '不适用')
-            fund_details = item.get('fund_details', '')
-            fund_class = 'fund'
-            if '卖' in fund_signal or '卖出' in fund_signal:
-                fund_class = 'fund sell'
-            elif '观' in fund_signal or '观望' in fund_signal:
-                fund_class = 'fund hold'
-            
-            # 关键词
-            keywords_html = ''
-            for kw in item.get('key_words', [])[:5]:
-                keywords_html += f'<span class="keyword">{kw}</span>'
-            
-            # 原文链接
-            link = item.get('link', '')
-            source = item.get('source', '来源')
-            
-            # 原文标题（如果有翻译）
-            original_title_html = ''
-            if item.get('original_title'):
-                original_title_html = f'<div class="original-title">原文: {item.get("original_title")}</div>'
-            
-            # 增强分析维度
-            relevance = item.get('relevance', '待分析')
-            impact_level = item.get('impact_level', '中-待分析')
-            timeliness = item.get('timeliness', '待分析')
-            certainty = item.get('certainty', '中-待分析')
-            opportunity_type = item.get('opportunity_type', '不适用')
-            
-            dimensions_html = f'''
+
+# 新闻卡片模板，缺失字段使用 CARD_DEFAULTS 中的默认值
+CARD_TEMPLATE = '''
+            <article class="news-card" data-category="{category}" data-index="{index}" onclick="openModal({index})">
+                <div class="card-header">
+                    <span class="category-tag {category}">{category_name}</span>
+                    <span class="relevance-score">★ {relevance_score}</span>
+                </div>
+                <h2 class="card-title">{title}</h2>
+                {original_title_html}
+                <div class="core-point">{core_point}</div>
+                
+                <div class="insight-section">
+                    <div class="insight-row">
+                        <div class="insight-box {fund_class}">
+                            <div class="insight-label">💰 基金建议</div>
+                            <div class="insight-content">{fund_signal}</div>
+                        </div>
+                        <div class="insight-box dev">
+                            <div class="insight-label">👨‍💻 开发者影响</div>
+                            <div class="insight-content">{dev_impact}</div>
+                        </div>
+                    </div>
+                    
             <div class="analysis-dimensions">
                 <div class="dimension-item">
                     <div class="dimension-label">📊 相关性</div>
@@ -628,37 +631,44 @@ class ReportGenerator:
                     <div class="dimension-label">🎯 机会类型</div>
                     <div>{opportunity_type}</div>
                 </div>
-            </div>'''
-            
-            html += f'''
-            <article class="news-card" data-category="{category}" data-index="{i}" onclick="openModal({i})">
-                <div class="card-header">
-                    <span class="category-tag {category}">{category_name}</span>
-                    <span class="relevance-score">★ {item.get('relevance_score', 5)}</span>
-                </div>
-                <h2 class="card-title">{item.get('title', '无标题')}</h2>
-                {original_title_html}
-                <div class="core-point">{item.get('core_point', '无')}</div>
-                
-                <div class="insight-section">
-                    <div class="insight-row">
-                        <div class="insight-box {fund_class}">
-                            <div class="insight-label">💰 基金建议</div>
-                            <div class="insight-content">{fund_signal}</div>
-                        </div>
-                        <div class="insight-box dev">
-                            <div class="insight-label">👨‍💻 开发者影响</div>
-                            <div class="insight-content">{item.get('dev_impact', '无明显影响')}</div>
-                        </div>
-                    </div>
-                    {dimensions_html}
+            </div>
                 </div>
                 
                 {keywords_html}
             </article>
 '''
-        
-        html += '''
+
+CARD_DEFAULTS = {
+    'title': '无标题',
+    'core_point': '无',
+    'relevance_score': 5,
+    'fund_signal': '不适用',
+    'dev_impact': '无明显影响',
+    'relevance': '待分析',
+    'impact_level': '中-待分析',
+    'timeliness': '待分析',
+    'certainty': '中-待分析',
+    'opportunity_type': '不适用'
+}
+
+# Markdown 简报末尾的免责声明
+MARKDOWN_FOOTER = """## ⚠️ 免责声明
+
+本简报内容仅供参考，不构成任何投资建议。基金投资有风险，请谨慎决策。
+
+*由AI自动生成*"""
+
+# 需要HTML转义后填入卡片模板的新闻字段
+CARD_TEXT_FIELDS = tuple(CARD_DEFAULTS)
+get_card_fields = itemgetter(*CARD_TEXT_FIELDS)
+
+# 模板渲染函数（模块加载时绑定一次 format 方法，生成报告时直接调用）
+render_head = REPORT_HEAD_TEMPLATE.format
+render_body = REPORT_BODY_TEMPLATE.format
+render_card = CARD_TEMPLATE.format_map
+
+# 新闻列表之后的页脚与弹窗，末尾接 newsData 数据
+REPORT_FOOTER = '''
         </div>
     </main>
     
@@ -688,20 +698,9 @@ class ReportGenerator:
     
     <script>
         const newsData = '''
-        
-        # 添加新闻数据到JavaScript
-        news_json = []
-        for i, item in enumerate(news_list):
-            news_json.append({
-                'title': item.get('title', ''),
-                'link': item.get('link', ''),
-                'source': item.get('source', ''),
-                'original_title': item.get('original_title', '')
-            })
-        
-        html += json.dumps(news_json, ensure_ascii=False)
-        
-        html += ''';
+
+# 页面脚本（紧跟 newsData 数据之后）
+REPORT_SCRIPT = ''';
         
         let currentIndex = 0;
         
@@ -726,14 +725,30 @@ class ReportGenerator:
             });
         }
         
+        // 只允许 http(s) 链接，避免 javascript: 等协议被执行
+        function safeLink(link) {
+            return /^https?:/i.test(link || '') ? link : '';
+        }
+        
         function openModal(index) {
             currentIndex = index;
             const news = newsData[index];
-            if (!news || !news.link) return;
+            const link = news ? safeLink(news.link) : '';
+            if (!link) return;
             
             document.getElementById('modalTitle').textContent = news.title || '新闻详情';
-            document.getElementById('modalIframe').src = news.link;
-            document.getElementById('modalSource').innerHTML = news.source ? `来源: <a href="${news.link}" target="_blank">${news.source}</a>` : '';
+            document.getElementById('modalIframe').src = link;
+            // 来源用 DOM 节点构建，新闻内容只作为文本插入
+            const sourceEl = document.getElementById('modalSource');
+            sourceEl.textContent = '';
+            if (news.source) {
+                const sourceLink = document.createElement('a');
+                sourceLink.href = link;
+                sourceLink.target = '_blank';
+                sourceLink.rel = 'noopener';
+                sourceLink.textContent = news.source;
+                sourceEl.append('来源: ', sourceLink);
+            }
             document.getElementById('modalBtn').onclick = function() { openOriginal(); };
             document.getElementById('newsModal').classList.add('active');
             document.body.style.overflow = 'hidden';
@@ -747,8 +762,9 @@ class ReportGenerator:
         
         function openOriginal() {
             const news = newsData[currentIndex];
-            if (news && news.link) {
-                window.open(news.link, '_blank');
+            const link = news ? safeLink(news.link) : '';
+            if (link) {
+                window.open(link, '_blank', 'noopener');
             }
         }
         
@@ -760,142 +776,221 @@ class ReportGenerator:
     </script>
 </body>
 </html>'''
+
+
+def dumps_compact(data: Any) -> str:
+    """紧凑格式序列化JSON（不转义非ASCII字符）"""
+    if orjson is not None:
+        return orjson.dumps(data).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps_indented(data: Any) -> bytes:
+    """缩进两格序列化JSON并编码为UTF-8（用于JSON备份文件）"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def fund_class_for(fund_signal: str) -> str:
+    """根据基金建议文本返回卡片样式类，固定取值直接查表"""
+    fund_class = FUND_CLASS_TABLE.get(fund_signal)
+    if fund_class is not None:
+        return fund_class
+    if '卖' in fund_signal:
+        return 'fund sell'
+    if '观' in fund_signal:
+        return 'fund hold'
+    return 'fund'
+
+
+class ReportGenerator:
+    """新闻简报生成器（不保存按日期计算的状态，长期运行的进程可复用同一个实例）"""
+    
+    def generate_html(self, news_list: List[Dict[str, Any]],
+                      prepared: Optional[Tuple[list, Counter]] = None) -> str:
+        """生成杂志风格HTML格式的简报"""
+        return ''.join(self._iter_html(news_list, prepared))
+    
+    def _iter_html(self, news_list: List[Dict[str, Any]],
+                   prepared: Optional[Tuple[list, Counter]] = None,
+                   now: Optional[datetime] = None) -> Iterator[str]:
+        """逐段生成HTML简报内容，便于直接流式写入文件（now 为报告时间，缺省取当前时间）"""
+        
+        # 预计算分类信息与统计
+        enriched, counts = prepared or self._prepare(news_list)
+        stats = {cat: counts[cat] for cat in CATEGORY_ORDER}
+        today = (now or datetime.now()).strftime('%Y-%m-%d')
+        
+        yield render_head(today=today)
+        yield REPORT_CSS
+        yield render_body(
+            date=today,
+            total=len(news_list),
+            **stats
+        )
+        
+        # 添加新闻卡片
+        for i, (category, category_name, item) in enumerate(enriched):
+            merged = {**CARD_DEFAULTS, **item}
+            
+            # 基金建议样式
+            fund_class = fund_class_for(merged['fund_signal'])
+            
+            # 关键词
+            keywords = map(escape, map(str, item.get('key_words', [])[:5]))
+            keywords_html = ''.join(map(KEYWORD_TEMPLATE, keywords))
+            
+            # 原文标题（如果有翻译）
+            original_title_html = ''
+            if item.get('original_title'):
+                original_title_html = f'<div class="original-title">原文: {escape(str(item["original_title"]))}</div>'
+            
+            # 新闻字段统一转义，避免标题等内容中的 < & " 破坏页面结构
+            card = dict(zip(CARD_TEXT_FIELDS, map(escape, map(str, get_card_fields(merged)))))
+            card.update({
+                'index': i,
+                'category': category,
+                'category_name': category_name,
+                'fund_class': fund_class,
+                'keywords_html': keywords_html,
+                'original_title_html': original_title_html
+            })
+            yield render_card(card)
+        
+        yield REPORT_FOOTER
+        
+        # 添加新闻数据到JavaScript
+        news_json = [{
+            'title': item.get('title', ''),
+            'link': item.get('link', ''),
+            'source': item.get('source', ''),
+            'original_title': item.get('original_title', '')
+        } for item in news_list]
+        
+        # 转义 "</"，防止数据中的 </script> 提前结束脚本块
+        yield dumps_compact(news_json).replace('</', '<\\/')
         
-        return html
+        yield REPORT_SCRIPT
     
-    def generate_markdown(self, news_list: List[Dict[str, Any]]) -> str:
+    def generate_markdown(self, news_list: List[Dict[str, Any]],
+                          prepared: Optional[Tuple[list, Counter]] = None) -> str:
         """生成Markdown格式的简报"""
+        return ''.join(self._iter_markdown(news_list, prepared))
+    
+    def _iter_markdown(self, news_list: List[Dict[str, Any]],
+                       prepared: Optional[Tuple[list, Counter]] = None,
+                       now: Optional[datetime] = None) -> Iterator[str]:
+        """逐段生成Markdown简报内容，便于直接流式写入文件（now 为报告时间，缺省取当前时间）"""
         
-        # 按分类分组
-        categorized = self._categorize_news(news_list)
+        enriched, counts = prepared or self._prepare(news_list)
         
-        # 构建报告
-        report_lines = []
+        # 单次遍历按分类格式化新闻条目（分类已在 _prepare 中归一化）
+        sections = {category: [] for category in CATEGORY_ORDER}
+        for category, _, item in enriched:
+            section = sections[category]
+            section.append(self._format_news_item(len(section) + 1, item))
         
         # 标题
-        report_lines.append(f"# 📊 每日重点新闻简报")
-        report_lines.append(f"**更新时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report_lines.append(f"**新闻数量**: {len(news_list)} 条")
-        report_lines.append("")
-        report_lines.append("---")
-        report_lines.append("")
+        yield "# 📊 每日重点新闻简报\n"
+        yield f"**更新时间**: {(now or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')}\n"
+        yield f"**新闻数量**: {len(news_list)} 条\n\n---\n\n"
         
         # 摘要统计
-        report_lines.append("## 📈 今日概览")
-        report_lines.append("")
+        yield "## 📈 今日概览\n\n"
         
-        for category in ['tech', 'science', 'society', 'international']:
-            count = len(categorized.get(category, []))
+        for category in CATEGORY_ORDER:
+            count = counts[category]
             icon = CATEGORY_ICONS.get(category, '📰')
             name = CATEGORY_NAMES.get(category, category)
-            report_lines.append(f"- {icon} **{name}**: {count} 条")
+            yield f"- {icon} **{name}**: {count} 条\n"
         
-        report_lines.append("")
-        report_lines.append("---")
-        report_lines.append("")
+        yield "\n---\n\n"
         
         # 按分类输出新闻
-        for category in ['tech', 'science', 'society', 'international']:
-            items = categorized.get(category, [])
-            if not items:
+        for category in CATEGORY_ORDER:
+            section = sections[category]
+            if not section:
                 continue
             
             icon = CATEGORY_ICONS.get(category, '📰')
             name = CATEGORY_NAMES.get(category, category)
             
-            report_lines.append(f"## {icon} {name}领域")
-            report_lines.append("")
+            yield f"## {icon} {name}领域\n\n"
             
-            for i, item in enumerate(items, 1):
-                report_lines.append(self._format_news_item(i, item))
-                report_lines.append("")
+            for entry in section:
+                yield entry
+                yield "\n\n"
             
-            report_lines.append("---")
-            report_lines.append("")
+            yield "---\n\n"
         
         # 底部提示
-        report_lines.append("## ⚠️ 免责声明")
-        report_lines.append("")
-        report_lines.append("本简报内容仅供参考，不构成任何投资建议。基金投资有风险，请谨慎决策。")
-        report_lines.append("")
-        report_lines.append("*由AI自动生成*")
-        
-        return '\n'.join(report_lines)
+        yield MARKDOWN_FOOTER
     
-    def _categorize_news(self, news_list: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
-        """按分类整理新闻"""
-        categorized = {
-            'tech': [],
-            'science': [],
-            'society': [],
-            'international': []
-        }
-        
+    def _prepare(self, news_list: List[Dict[str, Any]]) -> Tuple[list, Counter]:
+        """单次遍历预计算每条新闻的 (分类, 分类名, 新闻) 并统计各分类数量"""
+        enriched = []
         for item in news_list:
             category = item.get('category', 'tech')
-            if category in categorized:
-                categorized[category].append(item)
+            if category not in VALID_CATEGORIES:
+                # 未知分类归入科技，避免新闻在Markdown中被丢弃
+                category = 'tech'
+            enriched.append((category, CATEGORY_NAMES.get(category, category), item))
         
-        return categorized
+        return enriched, Counter(map(itemgetter(0), enriched))
     
     def _format_news_item(self, index: int, item: Dict[str, Any]) -> str:
         """格式化单条新闻"""
-        lines = []
-        
-        # 标题
-        title = item.get('title', '无标题')
-        lines.append(f"### {index}. {title}")
-        lines.append("")
-        
-        # 核心要点
-        core_point = item.get('core_point', '无')
-        lines.append(f"> **核心要点**: {core_point}")
-        lines.append("")
-        
-        # 基金建议
+        # 基金建议（可选）
+        fund_block = ''
         fund_signal = item.get('fund_signal', '不适用')
         if fund_signal and fund_signal != '不适用':
+            fund_block = f"> **💰 基金建议**: {fund_signal}\n"
             fund_details = item.get('fund_details', '')
-            lines.append(f"> **💰 基金建议**: {fund_signal}")
             if fund_details:
-                lines.append(f">    {fund_details}")
-            lines.append("")
-        
-        # 开发者影响
-        dev_impact = item.get('dev_impact', '无明显影响')
-        lines.append(f"> **👨‍💻 开发者影响**: {dev_impact}")
-        lines.append("")
-        
-        # 增强分析维度
-        relevance = item.get('relevance', '待分析')
-        impact_level = item.get('impact_level', '待分析')
-        timeliness = item.get('timeliness', '待分析')
-        certainty = item.get('certainty', '待分析')
-        opportunity_type = item.get('opportunity_type', '不适用')
-        
-        lines.append(f"> **📊 相关性**: {relevance}")
-        lines.append(f"> **📈 影响程度**: {impact_level}")
-        lines.append(f"> **⏰ 时效性**: {timeliness}")
-        lines.append(f"> **✅ 确定性**: {certainty}")
-        lines.append(f"> **🎯 机会类型**: {opportunity_type}")
-        lines.append("")
-        
-        # 关键词
+                fund_block += f">    {fund_details}\n"
+            fund_block += "\n"
+        
+        # 关键词（可选）
+        keywords_block = ''
         key_words = item.get('key_words', [])
         if key_words:
             keywords_str = ' '.join([f'`{kw}`' for kw in key_words[:5]])
-            lines.append(f"> **标签**: {keywords_str}")
-            lines.append("")
+            keywords_block = f"> **标签**: {keywords_str}\n\n"
         
         # 来源
         link = item.get('link', '')
         source = item.get('source', '')
-        if link:
-            lines.append(f"> **📎 来源**: [{source}]({link})")
-        else:
-            lines.append(f"> **📎 来源**: {source}")
-        
-        return '\n'.join(lines)
+        source_str = f"[{source}]({link})" if link else source
+        
+        return (
+            f"### {index}. {item.get('title', '无标题')}\n"
+            f"\n"
+            f"> **核心要点**: {item.get('core_point', '无')}\n"
+            f"\n"
+            f"{fund_block}"
+            f"> **👨‍💻 开发者影响**: {item.get('dev_impact', '无明显影响')}\n"
+            f"\n"
+            f"> **📊 相关性**: {item.get('relevance', '待分析')}\n"
+            f"> **📈 影响程度**: {item.get('impact_level', '待分析')}\n"
+            f"> **⏰ 时效性**: {item.get('timeliness', '待分析')}\n"
+            f"> **✅ 确定性**: {item.get('certainty', '待分析')}\n"
+            f"> **🎯 机会类型**: {item.get('opportunity_type', '不适用')}\n"
+            f"\n"
+            f"{keywords_block}"
+            f"> **📎 来源**: {source_str}"
+        )
+    
+    def _write_chunks(self, filepath: str, chunks: Iterator[str]):
+        """将文本片段编码为UTF-8后写入带大缓冲的二进制文件"""
+        with open(filepath, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            for chunk in chunks:
+                f.write(chunk.encode('utf-8'))
+    
+    def _write_json(self, filepath: str, data: Any):
+        """将数据序列化为缩进JSON后写入文件"""
+        with open(filepath, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(dumps_indented(data))
     
     def save_report(self, news_list: List[Dict[str, Any]], output_dir: str = None):
         """保存报告到文件"""
@@ -906,38 +1001,30 @@ class ReportGenerator:
         # 确保目录存在
         os.makedirs(output_dir, exist_ok=True)
         
-        # 生成Markdown
-        markdown = self.generate_markdown(news_list)
-        
-        # 保存Markdown文件
-        md_filename = f"news_report_{self.today}.md"
-        md_filepath = os.path.join(output_dir, md_filename)
-        
-        with open(md_filepath, 'w', encoding='utf-8') as f:
-            f.write(markdown)
-        
-        logger.info(f"Markdown报告已保存至: {md_filepath}")
-        
-        # 生成HTML
-        html = self.generate_html(news_list)
-        
-        # 保存HTML文件
-        html_filename = f"news_report_{self.today}.html"
-        html_filepath = os.path.join(output_dir, html_filename)
-        
-        with open(html_filepath, 'w', encoding='utf-8') as f:
-            f.write(html)
-        
-        logger.info(f"HTML报告已保存至: {html_filepath}")
-        
-        # 同时保存JSON备份
-        json_filename = f"news_report_{self.today}.json"
-        json_filepath = os.path.join(output_dir, json_filename)
-        
-        with open(json_filepath, 'w', encoding='utf-8') as f:
-            json.dump(news_list, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"JSON数据已保存至: {json_filepath}")
+        # 同一次保存的文件名与报告内容使用同一个时间点，避免跨零点时日期不一致
+        now = datetime.now()
+        today = now.strftime('%Y-%m-%d')
+        
+        # 分类信息只计算一次，供Markdown和HTML共用
+        prepared = self._prepare(news_list)
+        
+        md_filepath = os.path.join(output_dir, f"news_report_{today}.md")
+        html_filepath = os.path.join(output_dir, f"news_report_{today}.html")
+        json_filepath = os.path.join(output_dir, f"news_report_{today}.json")
+        
+        # Markdown、HTML（逐段写入，不在内存中拼出完整报告）和JSON备份三个文件并行写入
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                executor.submit(self._write_chunks, md_filepath, self._iter_markdown(news_list, prepared, now)):
+                    f"Markdown报告已保存至: {md_filepath}",
+                executor.submit(self._write_chunks, html_filepath, self._iter_html(news_list, prepared, now)):
+                    f"HTML报告已保存至: {html_filepath}",
+                executor.submit(self._write_json, json_filepath, news_list):
+                    f"JSON数据已保存至: {json_filepath}"
+            }
+            for future, message in futures.items():
+                future.result()
+                logger.info(message)
         
         return md_filepath, html_filepath
 
@@ -7,7 +7,7 @@
 
 import os
 import json
-import re
+import tempfile
 from datetime import datetime
 
 # 配置文件路径
@@ -16,6 +16,27 @@ DOCS_DIR = os.path.join(PROJECT_ROOT, 'docs')
 REPORTS_DIR = os.path.join(DOCS_DIR, 'reports')
 DATA_JSON_PATH = os.path.join(DOCS_DIR, 'data.json')
 
+# 报告文件名格式: news_report_YYYY-MM-DD.html
+REPORT_PREFIX = 'news_report_'
+REPORT_SUFFIX = '.html'
+REPORT_NAME_LENGTH = len(REPORT_PREFIX) + len('YYYY-MM-DD') + len(REPORT_SUFFIX)
+ASCII_DIGITS = frozenset('0123456789')
+
+def is_iso_date(date_str):
+    """是否为 YYYY-MM-DD 形式（只检查形状，不校验日期是否存在）"""
+    return (len(date_str) == 10
+            and date_str[4] == date_str[7] == '-'
+            and ASCII_DIGITS.issuperset(date_str[:4] + date_str[5:7] + date_str[8:]))
+
+def is_report_file(entry):
+    """判断目录项是否为 news_report_YYYY-MM-DD.html 报告文件"""
+    filename = entry.name
+    return (len(filename) == REPORT_NAME_LENGTH
+            and filename.startswith(REPORT_PREFIX)
+            and filename.endswith(REPORT_SUFFIX)
+            and is_iso_date(filename[len(REPORT_PREFIX):-len(REPORT_SUFFIX)])
+            and entry.is_file())
+
 def update_data_json():
     """扫描 reports 目录并更新 data.json"""
     print(f"正在更新 {DATA_JSON_PATH}...")
@@ -25,32 +46,43 @@ def update_data_json():
         print(f"错误: 报告目录不存在 {REPORTS_DIR}")
         return
 
-    reports_list = []
-    files = os.listdir(REPORTS_DIR)
+    # 2. 筛选报告文件；文件名格式固定，文件名倒序即日期倒序，只需排序一次
+    with os.scandir(REPORTS_DIR) as entries:
+        filenames = sorted((entry.name for entry in entries if is_report_file(entry)), reverse=True)
     
-    # 正则匹配文件名: news_report_YYYY-MM-DD.html
-    pattern = re.compile(r'news_report_(\d{4}-\d{2}-\d{2})\.html')
+    # 三个链接共用去掉 .html 后缀的文件名主干
+    stems = [filename[:-len(REPORT_SUFFIX)] for filename in filenames]
+    reports_list = [{
+        "date": stem[len(REPORT_PREFIX):],
+        "htmlUrl": f"./reports/{stem}.html",
+        "mdUrl": f"./reports/{stem}.md",
+        "jsonUrl": f"./reports/{stem}.json"
+    } for stem in stems]
     
-    for filename in files:
-        match = pattern.match(filename)
-        if match:
-            date_str = match.group(1)
-            reports_list.append({
-                "date": date_str,
-                "htmlUrl": f"./reports/{filename}",
-                "mdUrl": f"./reports/{filename.replace('.html', '.md')}",
-                "jsonUrl": f"./reports/{filename.replace('.html', '.json')}"
-            })
+    # 3. 内容未变化时不重写 data.json，保持文件 mtime 与下游缓存稳定
+    new_bytes = json.dumps(reports_list, indent=4, ensure_ascii=False).encode('utf-8')
+    try:
+        with open(DATA_JSON_PATH, 'rb') as f:
+            old_bytes = f.read()
+    except FileNotFoundError:
+        old_bytes = None
     
-    # 2. 按日期倒序排序
-    reports_list.sort(key=lambda x: x['date'], reverse=True)
+    if new_bytes == old_bytes:
+        print(f"✅ data.json 无变化，共包含 {len(reports_list)} 份报告")
+        return
     
-    # 3. 写入 data.json
+    # 4. 先写临时文件再原子替换，避免读取方看到写了一半的文件
+    tmp_path = None
     try:
-        with open(DATA_JSON_PATH, 'w', encoding='utf-8') as f:
-            json.dump(reports_list, f, indent=4, ensure_ascii=False)
+        with tempfile.NamedTemporaryFile('wb', dir=DOCS_DIR, prefix='.data.json.', delete=False) as f:
+            tmp_path = f.name
+            f.write(new_bytes)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, DATA_JSON_PATH)
         print(f"✅ 成功更新 data.json，共包含 {len(reports_list)} 份报告")
     except Exception as e:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
         print(f"❌ 写入 data.json 失败: {e}")
 
 if __name__ == "__main__":
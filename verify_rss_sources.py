@@ -6,19 +6,125 @@ RSS 源有效性验证脚本
 1. 测试 URL 是否能返回 200 状态码
 2. 验证返回内容是否为 XML 格式
 3. 输出有效的 NEWS_SOURCES 配置
+4. 缓存有效期内验证通过的源直接跳过（使用 --force 强制全部重新验证）
 """
 
 import sys
 import os
+import json
+import tempfile
 import requests
+from requests.adapters import HTTPAdapter
 import xml.etree.ElementTree as ET
-import pprint
 import ast
+import contextlib
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+# 并发验证的最大线程数（请求均为网络等待，线程数按源数量放开）
+VERIFY_WORKERS = 64
+# 单个源的请求超时（秒）
+VERIFY_TIMEOUT = 15
+# 格式判断最多读取的正文字节数，超出部分不再下载
+VERIFY_READ_LIMIT = 64 * 1024
+# 增量解析时每次送入解析器的字节数
+XML_PROBE_SIZE = 4096
+# 订阅源的根元素（去掉命名空间后）
+FEED_ROOT_TAGS = frozenset(('rss', 'feed', 'RDF'))
+
+# 伪装 User-Agent 防止被拦截
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
+}
+
+def create_session():
+    """创建共享连接池的会话，同一主机的多个源复用 TCP/TLS 连接"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=VERIFY_WORKERS, pool_maxsize=VERIFY_WORKERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+SESSION = create_session()
+
+# 验证后有效源配置的输出文件
+VALID_SOURCES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'valid_sources.json')
+
+# 验证结果缓存：记录每个源最近一次验证通过的时间，有效期内不再请求
+VERIFY_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rss_verify_cache.json')
+VERIFY_CACHE_TTL_HOURS = 24
+
+def load_verify_cache():
+    """读取验证结果缓存 {url: {'last_ok': ISO时间}}，不存在或损坏时返回空字典"""
+    try:
+        with open(VERIFY_CACHE_PATH, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def save_verify_cache(cache):
+    """先写临时文件再原子替换，保存验证结果缓存"""
+    cache_dir = os.path.dirname(VERIFY_CACHE_PATH)
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=cache_dir,
+                                         prefix='.rss_verify_cache.', delete=False) as f:
+            tmp_path = f.name
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, VERIFY_CACHE_PATH)
+    except OSError as e:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"保存验证缓存失败: {e}")
+
+def is_recently_verified(entry, now):
+    """缓存记录是否仍在有效期内"""
+    try:
+        last_ok = datetime.fromisoformat(entry['last_ok'])
+    except (KeyError, TypeError, ValueError):
+        return False
+    # 手工编辑或旧版本写入的无时区时间按 UTC 处理，避免与带时区的 now 相减时报错
+    if last_ok.tzinfo is None:
+        last_ok = last_ok.replace(tzinfo=timezone.utc)
+    return now - last_ok < timedelta(hours=VERIFY_CACHE_TTL_HOURS)
+
+# 提取出的 NEWS_SOURCES 缓存文件，news_fetcher.py 未修改时跳过 AST 解析
+NEWS_SOURCES_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'news_sources_cache.json')
+
+def _file_signature(file_path):
+    """文件签名：路径 + 修改时间 + 大小"""
+    stat = os.stat(file_path)
+    return [os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size]
+
+def _read_sources_cache(signature):
+    """读取与签名匹配的 NEWS_SOURCES 缓存，失效或不存在时返回 None"""
+    try:
+        with open(NEWS_SOURCES_CACHE_PATH, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cache.get('signature') != signature:
+        return None
+    return cache.get('sources')
+
+def _write_sources_cache(signature, sources):
+    """写入 NEWS_SOURCES 缓存（失败不影响验证）"""
+    try:
+        with open(NEWS_SOURCES_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'signature': signature, 'sources': sources}, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"写入 NEWS_SOURCES 缓存失败: {e}")
 
 def get_news_sources_from_file(file_path):
     """从文件中提取 NEWS_SOURCES 字典，避免导入整个模块带来的依赖问题"""
     try:
+        signature = _file_signature(file_path)
+        cached = _read_sources_cache(signature)
+        if cached is not None:
+            return cached
+        
         with open(file_path, 'r', encoding='utf-8') as f:
             tree = ast.parse(f.read())
             
@@ -27,48 +133,66 @@ def get_news_sources_from_file(file_path):
                 for target in node.targets:
                     if isinstance(target, ast.Name) and target.id == 'NEWS_SOURCES':
                         # 尝试将 AST 节点转换为 Python 对象
-                        return ast.literal_eval(node.value)
+                        sources = ast.literal_eval(node.value)
+                        _write_sources_cache(signature, sources)
+                        return sources
         print("未在文件中找到 NEWS_SOURCES 定义")
         return None
     except Exception as e:
         print(f"解析文件失败: {e}")
         return None
 
+def is_xml_content(content, complete):
+    """增量解析 XML：根元素为 rss/feed/RDF 时立即判定通过，
+    其他根元素则要求整体（正文被截断时为已读取部分）格式正确，格式错误抛出 ET.ParseError"""
+    parser = ET.XMLPullParser(events=('start',))
+    root_checked = False
+    for offset in range(0, len(content), XML_PROBE_SIZE):
+        parser.feed(content[offset:offset + XML_PROBE_SIZE])
+        # feed() 只把解析错误放入事件队列，每次都要取完事件，错误才会在 read_events() 中抛出
+        for _, element in parser.read_events():
+            if not root_checked:
+                if element.tag.rpartition('}')[2] in FEED_ROOT_TAGS:
+                    return True
+                root_checked = True
+    if complete:
+        parser.close()
+    return root_checked
+
 def check_rss(url):
     """验证单个 RSS 源"""
     try:
-        # 伪装 User-Agent 防止被拦截
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
-        }
+        # 1. 测试能不能返回 200（流式请求，先只接收响应头）
+        response = SESSION.get(url, timeout=VERIFY_TIMEOUT, stream=True)
         
-        # 1. 测试能不能返回 200
-        response = requests.get(url, headers=headers, timeout=15)
-        
-        if response.status_code != 200:
-            return url, False, f"状态码错误: {response.status_code}"
-            
-        # 2. 确定返回的内容是不是 xml 格式
-        content = response.content
-        
-        # 尝试解析 XML
-        try:
-            ET.fromstring(content)
-            return url, True, "OK"
-        except ET.ParseError:
-            # 如果严格解析失败，尝试宽松检查
-            content_str = content.decode('utf-8', errors='ignore').strip()
+        with contextlib.closing(response):
+            if response.status_code != 200:
+                return url, False, f"状态码错误: {response.status_code}"
             
-            # 检查头部特征
-            if content_str.startswith('<?xml') or content_str.startswith('<rss') or content_str.startswith('<feed'):
-                return url, True, "OK (格式检查通过)"
-                
-            # 检查 Content-Type
+            # 2. Content-Type 已声明为 XML/RSS 时直接通过，无需下载正文
             content_type = response.headers.get('Content-Type', '').lower()
             if 'xml' in content_type or 'rss' in content_type:
-                 return url, True, "OK (Header检查通过)"
+                return url, True, "OK (Header检查通过)"
             
-            return url, False, "非 XML 格式内容"
+            # 3. 只读取正文开头部分判断是不是 xml 格式，随后断开连接
+            content = response.raw.read(VERIFY_READ_LIMIT, decode_content=True)
+            truncated = len(content) >= VERIFY_READ_LIMIT
+        
+        # 尝试解析 XML，读到订阅源根元素即停止
+        try:
+            if is_xml_content(content, complete=not truncated):
+                return url, True, "OK"
+        except ET.ParseError:
+            pass
+        
+        # 如果严格解析失败，尝试宽松检查：直接比较开头字节，无需解码正文
+        head = content[:XML_PROBE_SIZE].lstrip()
+        
+        # 检查头部特征
+        if head.startswith((b'<?xml', b'<rss', b'<feed')):
+            return url, True, "OK (格式检查通过)"
+        
+        return url, False, "非 XML 格式内容"
             
     except requests.RequestException as e:
         return url, False, f"请求异常: {str(e)}"
@@ -95,44 +219,79 @@ def main():
     valid_count = 0
     invalid_count = 0
     
-    print(f"开始验证 RSS 源 (共 {sum(len(v) for v in news_sources.values())} 个)...")
-    print("-" * 60)
+    # 同一 URL 可能出现在多个分类中，只请求一次，再把结果分发到各分类
+    unique_urls = list(dict.fromkeys(url for urls in news_sources.values() for url in urls))
+    
+    # 有效期内验证通过的源直接沿用缓存结果
+    now = datetime.now(timezone.utc)
+    force = '--force' in sys.argv[1:]
+    verify_cache = load_verify_cache()
+    results = {}
+    for url in unique_urls:
+        if not force and is_recently_verified(verify_cache.get(url), now):
+            results[url] = (True, "OK (缓存)")
+    pending_urls = [url for url in unique_urls if url not in results]
+    
+    total = sum(len(v) for v in news_sources.values())
+    print(f"开始验证 RSS 源 (共 {total} 个，去重后 {len(unique_urls)} 个，"
+          f"缓存跳过 {len(results)} 个)...")
+    print("-" * 60, flush=True)
     
-    # 使用线程池并发验证，提高速度
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {}
-        for category, urls in news_sources.items():
-            valid_sources[category] = []
-            for url in urls:
-                futures[executor.submit(check_rss, url)] = (category, url)
+    # 使用线程池并发验证，所有源同时发出请求，总耗时约等于最慢的单个请求
+    with ThreadPoolExecutor(max_workers=max(1, min(VERIFY_WORKERS, len(pending_urls)))) as executor:
+        futures = {executor.submit(check_rss, url): url for url in pending_urls}
                 
         for future in as_completed(futures):
-            category, url = futures[future]
+            url = futures[future]
             try:
                 url_result, is_valid, reason = future.result()
             except Exception as e:
                 url_result, is_valid, reason = url, False, f"执行错误: {e}"
+            results[url] = (is_valid, reason)
             
+            # 更新缓存：验证通过记录时间，失败则移除记录
+            if is_valid:
+                verify_cache[url] = {'last_ok': now.isoformat()}
+            else:
+                verify_cache.pop(url, None)
+    
+    if pending_urls:
+        save_verify_cache(verify_cache)
+    
+    # 按配置顺序汇总结果，全部输出一次写入标准输出
+    lines = []
+    for category, urls in news_sources.items():
+        valid_sources[category] = []
+        for url in urls:
+            is_valid, reason = results[url]
             total_checked += 1
             
             if is_valid:
                 status_symbol = "✅"
                 valid_sources[category].append(url)
                 valid_count += 1
-                print(f"[{category}] {status_symbol} {url}")
+                lines.append(f"[{category}] {status_symbol} {url}")
             else:
                 status_symbol = "❌"
                 invalid_count += 1
-                print(f"[{category}] {status_symbol} {url} -> {reason}")
-
-    print("-" * 60)
+                lines.append(f"[{category}] {status_symbol} {url} -> {reason}")
+    
+    lines.append("-" * 60)
+    sys.stdout.write('\n'.join(lines) + '\n')
     print(f"验证完成! 总计: {total_checked}, 有效: {valid_count}, 无效: {invalid_count}")
     print("=" * 60)
     
     if invalid_count > 0:
         print("\n建议更新 NEWS_SOURCES 配置如下:\n")
-        # 格式化打印字典
-        pprint.pprint(valid_sources, width=120, sort_dicts=False)
+        # 输出 JSON（同时是合法的 Python 字典字面量，可直接粘贴回 NEWS_SOURCES）
+        valid_json = json.dumps(valid_sources, indent=4, ensure_ascii=False)
+        print(valid_json)
+        try:
+            with open(VALID_SOURCES_PATH, 'w', encoding='utf-8') as f:
+                f.write(valid_json + '\n')
+            print(f"\n已保存至: {VALID_SOURCES_PATH}")
+        except OSError as e:
+            print(f"\n保存有效源配置失败: {e}")
     else:
         print("\n所有源均有效，无需更新。")
 